@@ -0,0 +1 @@
+from . import db  # noqa: F401
@@ -0,0 +1,18 @@
+"""
+Authentication backends for helpdesk_project.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class UnreadCountBackend(ModelBackend):
+    """Load request.user with its unread notification count annotated"""
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.with_unread().get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
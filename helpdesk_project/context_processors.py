@@ -0,0 +1,36 @@
+"""
+Template context processors for helpdesk_project.
+"""
+
+from tickets.models import Notification
+
+
+def unread_notifications(request):
+    """Expose the unread notification count, computed once per request.
+
+    The count is taken from the user row loaded at the start of the request,
+    so views that change Notification.is_read must call
+    clear_unread_count(request) before rendering.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {'unread_count': 0}
+    
+    if not hasattr(request, 'user_unread_count'):
+        unread_count = getattr(user, 'unread_count', None)
+        if unread_count is None:
+            unread_count = Notification.objects.filter(user=user, is_read=False).count()
+        request.user_unread_count = unread_count
+    
+    return {'unread_count': request.user_unread_count}
+
+
+def clear_unread_count(request):
+    """Drop the cached unread count so the next render counts again"""
+    if hasattr(request, 'user_unread_count'):
+        del request.user_unread_count
+    
+    # request.user is usually a SimpleLazyObject, which forwards the delete
+    user = getattr(request, 'user', None)
+    if hasattr(user, 'unread_count'):
+        del user.unread_count
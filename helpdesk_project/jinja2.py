@@ -0,0 +1,40 @@
+"""
+Jinja2 environment for helpdesk_project.
+"""
+
+from django.template.defaultfilters import date
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.timezone import template_localtime
+from jinja2 import Environment
+
+
+def url(viewname, *args, **kwargs):
+    """Reverse a URL name, mirroring the {% url %} template tag"""
+    return reverse(viewname, args=args or None, kwargs=kwargs or None)
+
+
+def widthratio(value, max_value, max_width):
+    """Scale value against max_value, mirroring the {% widthratio %} template tag"""
+    if not max_value:
+        return 0
+    return round(value / max_value * max_width)
+
+
+def environment(**options):
+    from tickets.models import Ticket
+
+    env = Environment(**options)
+    env.globals.update({
+        'static': static,
+        'url': url,
+        'widthratio': widthratio,
+        'TicketStatus': Ticket.Status,
+        'TicketPriority': Ticket.Priority,
+        'TicketCategory': Ticket.Category,
+    })
+    env.filters.update({
+        'date': date,
+        'localtime': template_localtime,
+    })
+    return env
@@ -24,12 +24,16 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'post_office',
     'tickets'
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'django.middleware.gzip.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -43,13 +47,31 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'helpdesk_project.context_processors.unread_notifications',
+            ],
+        },
+    },
+    {
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [BASE_DIR / 'jinja2'],
+        'OPTIONS': {
+            'environment': 'helpdesk_project.jinja2.environment',
+            'context_processors': [
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'helpdesk_project.context_processors.unread_notifications',
             ],
         },
     },
@@ -58,12 +80,31 @@ TEMPLATES = [
 WSGI_APPLICATION = 'helpdesk_project.wsgi.application'
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# PostgreSQL when DB_NAME is set, SQLite (WAL mode, see db.py) for local development
+if os.environ.get('DB_NAME'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ['DB_NAME'],
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # Reuse connections across HTTP requests (checked only around requests)
+            'CONN_MAX_AGE': 60,
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                'timeout': 20,
+            },
+        }
     }
-}
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -92,6 +133,16 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Hashed filenames plus gzip/brotli copies, served by WhiteNoise
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Media files (uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -101,24 +152,62 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Custom user model
 AUTH_USER_MODEL = 'tickets.CustomUser'
+# ModelBackend stays listed so sessions created before UnreadCountBackend remain valid
+AUTHENTICATION_BACKENDS = [
+    'helpdesk_project.backends.UnreadCountBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Cache (Redis when REDIS_URL is set, local memory for development)
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
 
 # Session settings for "Remember me"
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 SESSION_COOKIE_AGE = 2592000  # 30 days
 SESSION_SAVE_EVERY_REQUEST = False
 
+# Messages travel in a cookie instead of the session
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
 # Email configuration (configure for production)
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For development
+# Mail is queued in the database and delivered by `manage.py send_queued_mail`
+EMAIL_BACKEND = 'post_office.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = 'noreply@itcafepade.edu.sv'
+# send_queued_mail reuses one SMTP connection per worker thread within each batch
+POST_OFFICE = {
+    'BACKENDS': {
+        'default': (
+            'django.core.mail.backends.smtp.EmailBackend' if EMAIL_HOST_USER
+            else 'django.core.mail.backends.console.EmailBackend'  # For development
+        ),
+    },
+}
 
 # File upload settings
 MAX_UPLOAD_SIZE = 5242880  # 5MB
 ALLOWED_IMAGE_TYPES = ['image/jpeg', 'image/png']
 MAX_PHOTOS_PER_TICKET = 5
+# Keep a full ticket upload in memory; Django compares this against the whole
+# request body, not each file, so it covers every allowed photo at full size
+FILE_UPLOAD_MAX_MEMORY_SIZE = MAX_UPLOAD_SIZE * MAX_PHOTOS_PER_TICKET
+DATA_UPLOAD_MAX_NUMBER_FILES = MAX_PHOTOS_PER_TICKET
 
 # Ticket archiving settings
 DAYS_UNTIL_ARCHIVE = 30
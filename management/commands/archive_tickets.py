@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tickets.models import Ticket
+
+
+class Command(BaseCommand):
+    help = 'Archive tickets closed or rejected more than DAYS_UNTIL_ARCHIVE days ago'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.DAYS_UNTIL_ARCHIVE)
+
+    def handle(self, *args, **options):
+        archived = Ticket.objects.archive_closed(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'{archived} tickets archived'))
@@ -1,29 +1,62 @@
-from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.db import models, transaction
+from django.db.models import Count, F, Max, Prefetch, Q, Value
+from django.db.models.functions import Concat, Trim
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.core.files.base import ContentFile
 from django.utils import timezone
+from datetime import timedelta
+from io import BytesIO
+from PIL import Image, ImageOps
+import base64
+import os
 import secrets
-import string
 
 
 def generate_access_code():
-    """Generate a unique 12-character alphanumeric access code"""
-    return ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(12))
+    """Generate a unique 12-character alphanumeric access code (base32, 60 bits)"""
+    return base64.b32encode(secrets.token_bytes(8))[:12].decode('ascii')
 
 
 def generate_ticket_number():
     """Generate ticket number in format TCK-YYYY-NNNN"""
     year = timezone.now().year
-    last_ticket = Ticket.objects.filter(
-        ticket_number__startswith=f'TCK-{year}'
-    ).order_by('-created_at').first()
+    counter = TicketCounter.objects.filter(year=year)
+    with transaction.atomic():
+        # Write first: SQLite can't upgrade a read snapshot to a write lock
+        if not counter.update(last_number=F('last_number') + 1):
+            TicketCounter.objects.get_or_create(
+                year=year,
+                defaults={'last_number': lambda: _last_ticket_number(year)},
+            )
+            counter.update(last_number=F('last_number') + 1)
+        last_number = counter.values_list('last_number', flat=True).get()
     
-    if last_ticket:
-        last_num = int(last_ticket.ticket_number.split('-')[-1])
-        new_num = last_num + 1
-    else:
-        new_num = 1
+    return f'TCK-{year}-{last_number:04d}'
+
+
+def _last_ticket_number(year):
+    """Seed a new year counter from tickets created before the counter existed"""
+    last_number = Ticket.objects.filter(
+        ticket_number__startswith=f'TCK-{year}-'
+    ).order_by('-id').values_list('ticket_number', flat=True).first()
+    
+    if last_number:
+        return int(last_number.split('-')[-1])
+    return 0
+
+
+class CustomUserManager(UserManager):
+    """User manager with notification helpers"""
+    
+    def with_unread(self):
+        """Annotate each user with its number of unread notifications"""
+        return self.get_queryset().annotate(
+            unread_count=Count('notifications', filter=Q(notifications__is_read=False))
+        )
     
-    return f'TCK-{year}-{new_num:04d}'
+    def with_active_code(self, code):
+        """Users holding an active access code (uses the unique access_code index)"""
+        return self.filter(access_code=code, is_code_active=True)
 
 
 class CustomUser(AbstractUser):
@@ -39,6 +72,8 @@ class CustomUser(AbstractUser):
     code_sent_count = models.IntegerField(default=0)
     is_code_active = models.BooleanField(default=True)
     
+    objects = CustomUserManager()
+    
     def __str__(self):
         return f"{self.get_full_name()} ({self.institutional_email})"
     
@@ -51,37 +86,98 @@ class CustomUser(AbstractUser):
         return self.access_code
 
 
+class TicketCounter(models.Model):
+    """Per-year sequence used to number tickets"""
+    year = models.IntegerField(unique=True)
+    last_number = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.year}: {self.last_number}"
+
+
+class TicketStatus(models.IntegerChoices):
+    """Ticket lifecycle states (module level so Ticket.Meta can refer to them)"""
+    ABIERTO = 1, 'Abierto'
+    EN_PROGRESO = 2, 'En Progreso'
+    RECHAZADO = 3, 'Rechazado'
+    CERRADO = 4, 'Cerrado'
+    ARCHIVADO = 5, 'Archivado'
+
+
+class TicketQuerySet(models.QuerySet):
+    """Query helpers for ticket listings"""
+
+    def with_related(self):
+        """Load user, attachments and history in a fixed number of queries"""
+        return self.select_related('user').prefetch_related(
+            Prefetch('attachments'),
+            Prefetch('history', queryset=TicketHistory.objects.select_related('user')),
+        )
+    
+    def with_detail(self, history_limit=20):
+        """Load a ticket with its attachments and only its latest history entries"""
+        recent_history = TicketHistory.objects.select_related('user').only(
+            'ticket', 'user', 'action', 'comment', 'timestamp',
+            'user__first_name', 'user__last_name',
+        ).order_by('-timestamp')[:history_limit]
+        return self.select_related('user').prefetch_related(
+            Prefetch('attachments'),
+            Prefetch('history', queryset=recent_history, to_attr='recent_history'),
+        )
+    
+    def archive_closed(self, days):
+        """Archive tickets closed or rejected more than `days` days ago"""
+        cutoff = timezone.now() - timedelta(days=days)
+        stale = self.select_for_update().filter(
+            status__in=[Ticket.Status.CERRADO, Ticket.Status.RECHAZADO], closed_at__lt=cutoff
+        )
+        with transaction.atomic():
+            TicketHistory.objects.bulk_create([
+                TicketHistory(ticket_id=ticket_id, action=TicketHistory.Action.ARCHIVED)
+                for ticket_id in stale.values_list('id', flat=True)
+            ])
+            # update() bypasses auto_now; bump updated_at so last_modified() moves
+            return stale.update(status=Ticket.Status.ARCHIVADO, updated_at=timezone.now())
+    
+    def last_modified(self):
+        """Latest update time, for @last_modified on ticket list views"""
+        return self.aggregate(last_modified=Max('updated_at'))['last_modified']
+    
+    def for_list(self):
+        """Skip the full description; listings use short_description"""
+        return self.defer('description')
+    
+    def with_user_name(self):
+        """Annotate the owner's full name so __str__ doesn't fetch the user"""
+        return self.annotate(
+            user_full_name=Trim(Concat('user__first_name', Value(' '), 'user__last_name'))
+        )
+
+
 class Ticket(models.Model):
     """Ticket model for helpdesk system"""
-    STATUS_CHOICES = [
-        ('ABIERTO', 'Abierto'),
-        ('EN_PROGRESO', 'En Progreso'),
-        ('RECHAZADO', 'Rechazado'),
-        ('CERRADO', 'Cerrado'),
-        ('ARCHIVADO', 'Archivado'),
-    ]
+    Status = TicketStatus
     
-    PRIORITY_CHOICES = [
-        ('ALTA', 'Alta'),
-        ('MEDIA', 'Media'),
-        ('BAJA', 'Baja'),
-    ]
+    class Priority(models.IntegerChoices):
+        ALTA = 1, 'Alta'
+        MEDIA = 2, 'Media'
+        BAJA = 3, 'Baja'
     
-    CATEGORY_CHOICES = [
-        ('COMPUTADORA', 'Computadora (PC)'),
-        ('IMPRESORA', 'Impresora'),
-        ('SOFTWARE', 'Aplicación/Software'),
-        ('RED', 'Red/Conectividad'),
-        ('ACCESO', 'Acceso/Cuenta'),
-        ('OTRO', 'Otro'),
-    ]
+    class Category(models.IntegerChoices):
+        COMPUTADORA = 1, 'Computadora (PC)'
+        IMPRESORA = 2, 'Impresora'
+        SOFTWARE = 3, 'Aplicación/Software'
+        RED = 4, 'Red/Conectividad'
+        ACCESO = 5, 'Acceso/Cuenta'
+        OTRO = 6, 'Otro'
     
-    ticket_number = models.CharField(max_length=20, unique=True, default=generate_ticket_number)
+    ticket_number = models.CharField(max_length=20, unique=True, blank=True)
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='tickets')
     description = models.TextField()
-    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
-    priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='MEDIA')
-    status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='ABIERTO')
+    short_description = models.CharField(max_length=60, blank=True, editable=False)
+    category = models.PositiveSmallIntegerField(choices=Category.choices)
+    priority = models.PositiveSmallIntegerField(choices=Priority.choices, default=Priority.MEDIA)
+    status = models.PositiveSmallIntegerField(choices=Status.choices, default=Status.ABIERTO)
     affected_equipment = models.CharField(max_length=200)
     serial_number = models.CharField(max_length=100, blank=True, null=True)
     
@@ -98,48 +194,110 @@ class Ticket(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     closed_at = models.DateTimeField(blank=True, null=True)
     
+    objects = TicketQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='ticket_status_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='ticket_user_created_idx'),
+            models.Index(
+                fields=['closed_at'],
+                condition=Q(status__in=[TicketStatus.CERRADO, TicketStatus.RECHAZADO]),
+                name='closed_tickets_idx',
+            ),
+        ]
     
     def __str__(self):
-        return f"{self.ticket_number} - {self.user.get_full_name()}"
+        user_full_name = getattr(self, 'user_full_name', None)
+        if user_full_name is None:
+            user_full_name = self.user.get_full_name()
+        return f"{self.ticket_number} - {user_full_name}"
     
-    def get_short_description(self):
-        """Return first 50 characters of description"""
-        return self.description[:50] + '...' if len(self.description) > 50 else self.description
+    def save(self, *args, **kwargs):
+        """Keep short_description in sync and assign ticket_number on creation"""
+        if 'description' in self.__dict__:
+            self.short_description = (
+                self.description[:50] + '...' if len(self.description) > 50 else self.description
+            )
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'description' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'short_description'}
+        
+        # Number new tickets in the same transaction as the INSERT, so a
+        # number is only used up when a row is actually written
+        assign_number = self._state.adding and not self.ticket_number
+        try:
+            with transaction.atomic():
+                if assign_number:
+                    self.ticket_number = generate_ticket_number()
+                super().save(*args, **kwargs)
+        except Exception:
+            if assign_number:
+                self.ticket_number = ''
+            raise
 
 
 class TicketAttachment(models.Model):
     """Photo attachments for tickets"""
+    THUMBNAIL_SIZE = (256, 256)
+    
     ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='attachments')
     image = models.ImageField(upload_to='ticket_photos/%Y/%m/')
+    width = models.PositiveIntegerField(null=True, editable=False)
+    height = models.PositiveIntegerField(null=True, editable=False)
+    thumbnail = models.ImageField(upload_to='ticket_thumbs/%Y/%m/', blank=True, editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
+    def save(self, *args, **kwargs):
+        """Generate the thumbnail and dimensions once, when the image is first stored"""
+        if self.image and not self.thumbnail:
+            self.make_thumbnail()
+        super().save(*args, **kwargs)
+    
+    def make_thumbnail(self):
+        """Store the displayed size and a copy scaled down to THUMBNAIL_SIZE"""
+        self.image.open()
+        with Image.open(self.image) as img:
+            image_format = img.format
+            # Phone photos are stored sideways with an EXIF Orientation tag;
+            # apply it so dimensions and thumbnail match what browsers show
+            img = ImageOps.exif_transpose(img)
+            self.width, self.height = img.size
+            img.thumbnail(self.THUMBNAIL_SIZE)
+            buffer = BytesIO()
+            img.save(buffer, format=image_format)
+        self.image.seek(0)
+        name = os.path.basename(self.image.name)
+        self.thumbnail.save(name, ContentFile(buffer.getvalue()), save=False)
+    
     def __str__(self):
         return f"Attachment for {self.ticket.ticket_number}"
 
 
 class TicketHistory(models.Model):
     """Audit trail for ticket changes"""
-    ACTION_CHOICES = [
-        ('CREATED', 'Creado'),
-        ('STATUS_CHANGED', 'Estado Cambiado'),
-        ('VISIT_SCHEDULED', 'Visita Programada'),
-        ('REJECTED', 'Rechazado'),
-        ('CLOSED', 'Cerrado'),
-        ('NOTE_ADDED', 'Nota Agregada'),
-        ('ARCHIVED', 'Archivado'),
-    ]
+    class Action(models.IntegerChoices):
+        CREATED = 1, 'Creado'
+        STATUS_CHANGED = 2, 'Estado Cambiado'
+        VISIT_SCHEDULED = 3, 'Visita Programada'
+        REJECTED = 4, 'Rechazado'
+        CLOSED = 5, 'Cerrado'
+        NOTE_ADDED = 6, 'Nota Agregada'
+        ARCHIVED = 7, 'Archivado'
     
     ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='history')
     user = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True)
-    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    action = models.PositiveSmallIntegerField(choices=Action.choices)
     comment = models.TextField(blank=True, null=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-timestamp']
         verbose_name_plural = 'Ticket histories'
+        indexes = [
+            models.Index(fields=['ticket', '-timestamp'], name='history_ticket_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.ticket.ticket_number} - {self.get_action_display()} by {self.user}"
@@ -156,6 +314,9 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_unread_idx'),
+        ]
     
     def __str__(self):
         return f"Notification for {self.user.username}: {self.title}"